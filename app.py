@@ -2,13 +2,17 @@ import argparse
 import pandas as pd
 
 # Import functions from your project modules.
-from modules.input_profiler import main as run_input_profiler
-from modules.rag import index_data, get_or_create_collection, query_data
-from modules.code_generation import generate_code as run_code_generator
-from modules.visualization import render_visualization
+from modules.input_profiler import profile_dataset, generate_question, choose_viz_type
+from modules.rag import index_data, get_or_create_collection, warm_collection, query_data, condense_examples
+from modules.code_generation import generate_code as run_code_generator, generate_code_candidates
+from modules.visualization import render_visualization, render_first_success
+from modules.code_cache import lookup_code, store_code, drop_code, get_cache_stats
+from modules.pipeline import run_stages, report_timings
+from modules.dashboard import run_dashboard
+from modules.data_reduction import reduce_for_render
 
 # Import the generic metrics functions
-from evaluation.metrics import get_metric, compute_execution_pass_rate, compute_question_diversity_score, compute_retrieval_alignment_score
+from evaluation.metrics import get_metric, compute_execution_pass_rate, compute_question_diversity_score, compute_retrieval_alignment_score, compute_candidate_outcomes
 
 def run_pipeline(dataset_path="pokemon_df.csv"):
    """
@@ -16,6 +20,8 @@ def run_pipeline(dataset_path="pokemon_df.csv"):
    1. Input Profiling – reads CSV, extracts types and summary stats,
    and uses an LLM to generate a question and determine a visualization type.
    2. RAG – indexes annotations and retrieves a collection from persistent storage.
+   Steps 1 and 2 run as a stage graph, so loading the index overlaps with the profiler's
+   LLM calls and retrieval starts as soon as the question is known.
    3. Code Generation – queries the collection to fetch examples and generate code.
    4. Visualization Execution – executes the generated code to render a chart.
    5. Metrics Computation – updates persistent metrics including execution pass rate.
@@ -37,6 +43,19 @@ def run_pipeline(dataset_path="pokemon_df.csv"):
                   "--skip rag",
                   action="store_true",
                   help="Show performance metrics")
+   parser.add_argument("-k",
+                  "--candidates",
+                  type=int,
+                  default=1,
+                  help="Number of code candidates to generate and race; the first one that renders is kept")
+   parser.add_argument("-nc",
+                  "--no-cache",
+                  action="store_true",
+                  help="Always call the LLM instead of reusing cached code for similar requests")
+   parser.add_argument("-d",
+                  "--dashboard",
+                  type=int,
+                  help="Build a dashboard of this many charts from a single profiling pass")
    args = parser.parse_args()
 
    # maps arguments to their input values
@@ -47,34 +66,105 @@ def run_pipeline(dataset_path="pokemon_df.csv"):
 
    metrics_on = args.metrics
 
-   # Step 1: Input Profiling
-   print("=== Generating Input Profile ===")
    supported_vis_types = ["bar", "line", "scatter", "histogram"]
-   question, viz_type, columns, summary_stats, df = run_input_profiler(dataset_path, supported_vis_types, context, metrics_on)
+
+   if args.dashboard:
+      manifest = run_dashboard(dataset_path, args.dashboard, supported_vis_types, context, metrics_on, not args.no_cache, args.candidates)
+      print("Updating Records...")
+      for chart in manifest:
+         compute_execution_pass_rate(chart["success"])
+         if "candidates" in chart:
+            compute_candidate_outcomes(chart["candidates"])
+      compute_question_diversity_score()
+      if metrics_on:
+         print("=== Generating Metrics ===")
+         print("Trials:", round(get_metric("num_trials"), 4))
+         print("Execution pass rate:", round(get_metric("execution_pass_rate"), 4))
+         if args.candidates > 1:
+            print("Candidate pass rate:", round(get_metric("candidate_pass_rate"), 4))
+      return
+
+   def load_index():
+      annotations, _ = index_data()
+      return warm_collection(get_or_create_collection(annotations))
+
+   def retrieve(question, index):
+      return condense_examples(query_data(question, index))
+
+   # Step 1: Input Profiling and Step 2: RAG – Load or Create Persistent Collection
+   print("=== Generating Input Profile and Indexing Vector Database ===")
+   stages = {
+      "profile": (lambda: profile_dataset(dataset_path), []),
+      "index": (load_index, []),
+      "question": (lambda profile: generate_question(profile[0], profile[1], supported_vis_types, context, metrics_on), ["profile"]),
+      "viz_type": (lambda profile, question: choose_viz_type(question, profile[0], profile[1], supported_vis_types), ["profile", "question"]),
+      "examples": (retrieve, ["question", "index"]),
+      "reduce": (lambda profile, question, viz_type: reduce_for_render(profile[2], viz_type, question), ["profile", "question", "viz_type"]),
+   }
+   results, timings = run_stages(stages)
+
+   columns, summary_stats, df = results["profile"]
+   question = results["question"]
+   viz_type = results["viz_type"]
+   examples = results["examples"]
+   # Large datasets are reduced for the chart type; the generated code only ever sees the reduced frame.
+   # The prompt describes the reduced frame, while the code cache is keyed on the original columns.
+   df, reduction, data_note = results["reduce"]
+   prompt_columns = {col: str(dtype) for col, dtype in df.dtypes.items()} if reduction else columns
    print("=== Input Profiling Completed ===")
    print("Data Question:", question)
    print("Visualization Type:", viz_type)
-
-   # Step 2: RAG – Load or Create Persistent Collection
-   print("=== Indexing Vector Database ===")
-   annotations, _ = index_data()
-   collection = get_or_create_collection(annotations)
    print("=== RAG Module: Data Indexed or Loaded from Cache ===")
-   examples = query_data(question, collection)
    print("Examples Retrieved:", examples)
+   if data_note:
+      print("Data Reduced:", data_note)
+   if metrics_on:
+      report_timings(stages, timings)
 
    # Step 3: Code Generation
-   generated_code = run_code_generator(viz_type, question, columns, summary_stats, df, examples, metrics_on)
-   print("=== Generated Code ===")
-   print(generated_code)
+   chart = None
+   cached_code = None if args.no_cache else lookup_code(viz_type, columns, question, reduction)
+   if cached_code:
+      generated_code = cached_code
+      print("=== Reusing Cached Code ===")
+      print(generated_code)
+
+      # Step 4: Visualization Execution
+      print("=== Executing Cached Visualization Code ===")
+      # Run on a copy so a failed attempt leaves df untouched for the regenerated code
+      chart = render_visualization(generated_code, df=df.copy())
+      if not chart:
+         print("Cached code failed to render; removing it from the cache and generating new code.")
+         drop_code(viz_type, columns, question, reduction)
+         cached_code = None
+
+   if not chart and args.candidates > 1:
+      candidates = generate_code_candidates(viz_type, question, prompt_columns, summary_stats, df, examples, metrics_on, args.candidates, data_note)
+      print(f"=== Generated {len(candidates)} Code Candidates ===")
+
+      # Step 4: Visualization Execution
+      print("=== Executing Candidates in Parallel ===")
+      chart, generated_code, outcomes = render_first_success(candidates, df=df)
+      for outcome in outcomes:
+         print(f"Candidate {outcome['index']+1}: {outcome['status']}" + (f" ({outcome['error']})" if outcome['error'] else ""))
+      compute_candidate_outcomes(outcomes)
+      if generated_code:
+         print("=== Generated Code ===")
+         print(generated_code)
+   elif not chart:
+      generated_code = run_code_generator(viz_type, question, prompt_columns, summary_stats, df, examples, metrics_on, data_note)
+      print("=== Generated Code ===")
+      print(generated_code)
 
-   # Step 4: Visualization Execution
-   print("=== Executing Generated Visualization Code ===")
-   chart = render_visualization(generated_code, df=df)
+      # Step 4: Visualization Execution
+      print("=== Executing Generated Visualization Code ===")
+      chart = render_visualization(generated_code, df=df)
 
    if chart:
       print("Chart rendered successfully!")
       success = True
+      if not cached_code and not args.no_cache:
+         store_code(viz_type, columns, question, generated_code, reduction)
    else:
       print("No chart was rendered.")
       success = False
@@ -88,6 +178,9 @@ def run_pipeline(dataset_path="pokemon_df.csv"):
       print("Question diversity score:", round(get_metric("question_diversity_score"), 4))
       #  print("Retrieval alignment score:", round(get_metric("retrieval_alignment_score"), 4))
       print("Execution pass rate:", round(get_metric("execution_pass_rate"), 4))
+      if args.candidates > 1:
+         print("Candidate pass rate:", round(get_metric("candidate_pass_rate"), 4))
+      print("Code cache hit rate:", round(get_cache_stats()["hit_rate"], 4))
 
 def compute_metrics(code_executed):
    compute_question_diversity_score()
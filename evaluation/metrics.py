@@ -103,4 +103,28 @@ def compute_question_diversity_score(filepath=METRICS_FILE):
   return set_metric("question_diversity_score", question_diversity(), filepath)
 
 def compute_retrieval_alignment_score(filepath=METRICS_FILE):
-  return 0  
\ No newline at end of file
+  return 0  
+
+def compute_candidate_outcomes(outcomes, filepath=METRICS_FILE):
+  """
+  Records the outcomes of raced code candidates: 'num_candidates', one 'candidates_<status>' count
+  per status, and 'candidate_pass_rate', the share of candidates that finished and succeeded.
+  Cancelled candidates were stopped after another one won and do not count towards the pass rate.
+
+  Args:
+    outcomes (list): Outcome dicts as returned by render_first_success.
+    filepath (str): Path to the metrics file.
+
+  Returns:
+    dict: The updated metrics dictionary.
+  """
+  metrics = load_metrics(filepath)
+  for outcome in outcomes:
+    status = "candidates_" + outcome["status"].replace(" ", "_")
+    metrics[status] = metrics.get(status, 0) + 1
+    metrics["num_candidates"] = metrics.get("num_candidates", 0) + 1
+
+  finished = metrics.get("num_candidates", 0) - metrics.get("candidates_cancelled", 0)
+  metrics["candidate_pass_rate"] = (metrics.get("candidates_succeeded", 0) / finished) if finished > 0 else 0
+  save_metrics(metrics, filepath)
+  return metrics
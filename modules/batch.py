@@ -0,0 +1,274 @@
+import argparse
+import json
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import matplotlib.pyplot as plt
+
+from modules.llm.openai_client import client, build_request_body
+from modules.input_profiler import profile_dataset, log_question
+from modules.prompts import build_question_prompt, build_viz_type_prompt, build_codegen_prompt
+from modules.rag import index_data, get_or_create_collection, query_data_batch, condense_examples
+from modules.code_generation import extract_code_from_response, clean_code
+from modules.data_reduction import reduce_for_render
+from modules.visualization import render_visualization
+
+# Bulk mode runs the pipeline for a batch of datasets without interactive LLM calls.
+# Every LLM step is split in two phases:
+#   1. the prompts of all datasets are written to `<stage>_requests.jsonl`, in the request format
+#      of the OpenAI Batch API, to be submitted as a batch job (or run with run_local_batch);
+#   2. `advance_job` ingests the matching `<stage>_responses.jsonl` and continues the pipeline up
+#      to the next LLM step, or renders the charts after the last one.
+# The job state is kept in job.json inside the job directory, so phases can run hours apart.
+
+job_stages = ["question", "viz_type", "codegen", "done"]
+
+def prepare_job(dataset_paths, job_directory, supported_classes=["bar", "line", "scatter", "histogram"], context=""):
+    """
+    Start a bulk job: profile every dataset and write the data question requests.
+
+    Args:
+        dataset_paths (list): Paths to the CSV files.
+        job_directory (Path): Directory holding the job state, request and response files.
+        supported_classes (list, optional): List of allowed visualization types.
+        context (str, optional): Additional information from the user to direct the model's output.
+
+    Returns:
+        Path: The request file to submit.
+    """
+    job_directory = Path(job_directory)
+    job_directory.mkdir(parents=True, exist_ok=True)
+
+    job = {"stage": "question", "supported_classes": list(supported_classes), "context": context, "datasets": {}}
+    for i, dataset_path in enumerate(dataset_paths):
+        columns, summary_stats, _ = profile_dataset(dataset_path)
+        dataset_id = f"{i}-{Path(dataset_path).stem}"
+        job["datasets"][dataset_id] = {
+            "path": str(Path(dataset_path).resolve()),
+            "columns": columns,
+            "summary_stats": summary_stats,
+            "error": None,
+        }
+
+    requests = {}
+    for dataset_id, dataset in job["datasets"].items():
+        prompt, _ = build_question_prompt(supported_classes, dataset["columns"], dataset["summary_stats"], context)
+        requests[dataset_id] = build_request_body(prompt, 2.0, max_tok = 40)
+
+    save_job(job, job_directory)
+    return write_requests(requests, "question", job_directory)
+
+def advance_job(job_directory, responses_path=None):
+    """
+    Ingest the responses of the current stage and continue the pipeline up to the next LLM step.
+
+    Args:
+        job_directory (Path): Directory holding the job state.
+        responses_path (Path, optional): Response file of the current stage.
+                                         Defaults to `<stage>_responses.jsonl` in the job directory.
+
+    Returns:
+        Path: The next request file to submit, or the manifest once all charts are rendered.
+    """
+    job_directory = Path(job_directory)
+    job = load_job(job_directory)
+    stage = job["stage"]
+    if stage == "done":
+        raise ValueError(f"Job in {job_directory} is already done")
+
+    responses = read_responses(responses_path or job_directory / f"{stage}_responses.jsonl")
+    active = {dataset_id: dataset for dataset_id, dataset in job["datasets"].items() if dataset["error"] is None}
+    for dataset_id, dataset in active.items():
+        content, error = responses.get(f"{dataset_id}:{stage}", (None, "no response"))
+        if error:
+            dataset["error"] = f"{stage}: {error}"
+        else:
+            dataset[stage] = content.strip() if stage != "codegen" else content
+    active = {dataset_id: dataset for dataset_id, dataset in active.items() if dataset["error"] is None}
+
+    if stage == "question":
+        next_path = _after_questions(job, active, job_directory)
+    elif stage == "viz_type":
+        next_path = _after_viz_types(active, job_directory)
+    else:
+        next_path = _render_charts(job, active, job_directory)
+
+    job["stage"] = job_stages[job_stages.index(stage) + 1]
+    save_job(job, job_directory)
+    return next_path
+
+def _after_questions(job, active, job_directory):
+    for dataset in active.values():
+        log_question(dataset["question"])
+
+    # Retrieval only needs the question, so it is done once for the whole batch here
+    annotations, _ = index_data()
+    collection = get_or_create_collection(annotations)
+    results = query_data_batch([dataset["question"] for dataset in active.values()], collection)
+    for dataset, result in zip(active.values(), results):
+        dataset["examples"] = condense_examples(result)
+
+    requests = {}
+    for dataset_id, dataset in active.items():
+        prompt, _ = build_viz_type_prompt(job["supported_classes"], dataset["question"], dataset["columns"], dataset["summary_stats"])
+        requests[dataset_id] = build_request_body(prompt, 2.0)
+    return write_requests(requests, "viz_type", job_directory)
+
+def _after_viz_types(active, job_directory):
+    requests = {}
+    for dataset_id, dataset in active.items():
+        _, _, df = profile_dataset(dataset["path"])
+        df, _, data_note = reduce_for_render(df, dataset["viz_type"], dataset["question"])
+        columns = {col: str(dtype) for col, dtype in df.dtypes.items()}
+        prompt, _ = build_codegen_prompt(dataset["viz_type"], dataset["question"], columns, dataset["summary_stats"],
+                                         df, dataset["examples"], data_note)
+        requests[dataset_id] = build_request_body(prompt)
+    return write_requests(requests, "codegen", job_directory)
+
+def _render_charts(job, active, job_directory):
+    chart_directory = job_directory / "charts"
+    chart_directory.mkdir(exist_ok=True)
+
+    plt.switch_backend("Agg")
+    for dataset_id, dataset in active.items():
+        try:
+            dataset["code"] = clean_code(extract_code_from_response(dataset.pop("codegen")))
+        except Exception as e:
+            dataset["error"] = f"codegen: {e}"
+            continue
+
+        _, _, df = profile_dataset(dataset["path"])
+        df, _, _ = reduce_for_render(df, dataset["viz_type"], dataset["question"])
+        image_path = chart_directory / f"{dataset_id}.png"
+        plt.close("all")
+        if render_visualization(dataset["code"], df=df, save_path=str(image_path)):
+            dataset["image"] = str(image_path.relative_to(job_directory))
+        else:
+            dataset["error"] = "render failed"
+
+    manifest = [
+        {"dataset": dataset_id, "question": dataset.get("question"), "viz_type": dataset.get("viz_type"),
+         "code": dataset.get("code"), "image": dataset.get("image"), "error": dataset["error"]}
+        for dataset_id, dataset in job["datasets"].items()
+    ]
+    manifest_path = job_directory / "manifest.json"
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest_path
+
+def write_requests(requests, stage, job_directory):
+    """
+    Write request bodies as a JSONL file in the OpenAI Batch API input format.
+
+    Args:
+        requests (dict): Mapping of dataset id to chat completion request body.
+        stage (str): The pipeline stage, used in the custom ids and the file name.
+        job_directory (Path): Directory the file is written to.
+
+    Returns:
+        Path: The written request file.
+    """
+    requests_path = Path(job_directory) / f"{stage}_requests.jsonl"
+    with open(requests_path, "w") as f:
+        for dataset_id, body in requests.items():
+            f.write(json.dumps({
+                "custom_id": f"{dataset_id}:{stage}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": body,
+            }) + "\n")
+    print(f"Wrote {len(requests)} {stage} requests to {requests_path}")
+    return requests_path
+
+def read_responses(responses_path):
+    """
+    Read a JSONL file in the OpenAI Batch API output format.
+
+    Returns:
+        dict: Mapping of custom id to a (content, error) tuple, where exactly one of the two is None.
+    """
+    responses = {}
+    with open(responses_path, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            response = record.get("response") or {}
+            if record.get("error") or response.get("status_code") != 200:
+                error = record.get("error") or response.get("body", {}).get("error")
+                responses[record["custom_id"]] = (None, str(error or f"status code {response.get('status_code')}"))
+                continue
+            content = response["body"]["choices"][0]["message"]["content"]
+            responses[record["custom_id"]] = (content, None)
+    return responses
+
+def run_local_batch(requests_path, responses_path=None, max_workers=4):
+    """
+    Local stand-in for the batch endpoint: send every request in a request file and write the
+    results in the batch output format.
+
+    Args:
+        requests_path (Path): Request file written by write_requests.
+        responses_path (Path, optional): Where to write the responses. Defaults to the request
+                                         file name with `requests` replaced by `responses`.
+        max_workers (int, optional): Number of requests sent concurrently. Defaults to 4.
+
+    Returns:
+        Path: The written response file.
+    """
+    requests_path = Path(requests_path)
+    responses_path = Path(responses_path or requests_path.with_name(requests_path.name.replace("requests", "responses")))
+    with open(requests_path, "r") as f:
+        requests = [json.loads(line) for line in f if line.strip()]
+
+    def send(i, request):
+        try:
+            completion = client.chat.completions.create(**request["body"])
+            response = {"status_code": 200, "request_id": completion.id, "body": completion.model_dump()}
+            error = None
+        except Exception as e:
+            response = None
+            error = {"code": type(e).__name__, "message": str(e)}
+        return {"id": f"batch_req_{i}", "custom_id": request["custom_id"], "response": response, "error": error}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(send, range(len(requests)), requests))
+
+    with open(responses_path, "w") as f:
+        for result in results:
+            f.write(json.dumps(result) + "\n")
+    print(f"Wrote {len(results)} responses to {responses_path}")
+    return responses_path
+
+def load_job(job_directory):
+    with open(Path(job_directory) / "job.json", "r") as f:
+        return json.load(f)
+
+def save_job(job, job_directory):
+    with open(Path(job_directory) / "job.json", "w") as f:
+        json.dump(job, f, indent=2)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the pipeline as an offline bulk job built on JSONL request files")
+    parser.add_argument("--job-dir", default="data/batch_job", help="Directory holding the job state and JSONL files")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    prepare_parser = subparsers.add_parser("prepare", help="Profile datasets and write the data question requests")
+    prepare_parser.add_argument("datasets", nargs="+", help="CSV files to process")
+    prepare_parser.add_argument("-c", "--context", default="", help="Additional information from the user to direct the model's output")
+
+    local_parser = subparsers.add_parser("run-local", help="Send the current stage's requests directly instead of through the batch endpoint")
+    local_parser.add_argument("-w", "--workers", type=int, default=4, help="Number of concurrent requests")
+
+    advance_parser = subparsers.add_parser("advance", help="Ingest the current stage's responses and continue the pipeline")
+    advance_parser.add_argument("--responses", help="Response file, if not at the default location in the job directory")
+
+    args = parser.parse_args()
+    if args.command == "prepare":
+        print("Submit:", prepare_job(args.datasets, args.job_dir, context=args.context))
+    elif args.command == "run-local":
+        stage = load_job(args.job_dir)["stage"]
+        run_local_batch(Path(args.job_dir) / f"{stage}_requests.jsonl", max_workers=args.workers)
+    else:
+        result = advance_job(args.job_dir, args.responses)
+        print("Done:" if load_job(args.job_dir)["stage"] == "done" else "Submit:", result)
@@ -0,0 +1,210 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from modules.rag import embedding_function
+
+# Ensure project root is correctly identified (assuming modules/code_cache.py is in 'modules')
+script_dir = Path(__file__).parent.resolve()
+project_root = script_dir.parent.resolve()
+
+default_cache_path = project_root / "data" / "code_cache.json"
+
+# Dashboard mode looks up codes from several threads; the cache file is read-modify-written under this lock
+cache_lock = threading.RLock()
+
+# Code that rendered successfully is stored under (viz_type, normalized schema, data reduction,
+# question embedding). The schema is always the dataset's original columns; the reduction method
+# from data_reduction tells apart code written against a reduced frame.
+# A later request with the same viz_type and schema and a question within the similarity
+# threshold reuses the stored code instead of calling the LLM. The code is reused unchanged: a
+# similar question can still ask for a different computation (e.g. average instead of total), so
+# the chart keeps the title of the question it actually answers.
+
+def embed_question(question):
+    # Shares the annotation index's embedding model instead of loading a second copy
+    return np.asarray(embedding_function([question])[0], dtype=float)
+
+def normalize_schema(columns):
+    """
+    Reduce a column -> dtype mapping to a stable key that ignores column order, case and dtype width.
+
+    Args:
+        columns (dict): A dictionary of column names and their data types.
+
+    Returns:
+        str: The normalized schema key.
+    """
+    return "|".join(sorted(f"{str(name).strip().lower()}:{_dtype_family(dtype)}" for name, dtype in columns.items()))
+
+def _dtype_family(dtype):
+    dtype = str(dtype).lower()
+    if dtype.startswith(("int", "uint", "float")):
+        return "numeric"
+    if dtype.startswith("datetime"):
+        return "datetime"
+    if dtype.startswith("bool"):
+        return "bool"
+    return "text"
+
+def load_cache(filepath=default_cache_path):
+    """
+    Load the code cache from its JSON file.
+    Returns an empty cache if the file doesn't exist or if there's a JSON decoding error.
+    """
+    if os.path.exists(filepath):
+        try:
+            with open(filepath, "r") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, OSError):
+            pass
+    return {"entries": [], "stats": {"lookups": 0, "hits": 0}}
+
+def save_cache(cache, filepath=default_cache_path):
+    """
+    Save the code cache to its JSON file.
+    """
+    try:
+        Path(filepath).parent.mkdir(parents=True, exist_ok=True)
+        with open(filepath, "w") as f:
+            json.dump(cache, f)
+    except OSError as e:
+        print(f"Error saving code cache: {e}")
+
+def lookup_code(viz_type, columns, question, reduction="", threshold=0.9, filepath=default_cache_path):
+    """
+    Find stored code for a similar request.
+
+    Args:
+        viz_type (str): The visualization type determined by the input profiler.
+        columns (dict): A dictionary of the dataset's original column names and their data types.
+        question (str): The data question generated by the input profiler.
+        reduction (str, optional): The reduction method applied to the data before rendering, if any.
+        threshold (float, optional): Minimum cosine similarity between questions. Defaults to 0.9.
+        filepath (Path, optional): Path to the cache file.
+
+    Returns:
+        str or None: The stored code, or None on a cache miss.
+    """
+    with cache_lock:
+        cache = load_cache(filepath)
+        cache["stats"]["lookups"] += 1
+
+        best = _find_entry(cache, viz_type, columns, question, reduction, threshold)
+        if best is None:
+            save_cache(cache, filepath)
+            return None
+
+        cache["stats"]["hits"] += 1
+        best["hits"] += 1
+        best["last_used"] = time.time()
+        save_cache(cache, filepath)
+        if best["question"] != question:
+            print(f"Reusing cached code written for a similar question: {best['question']}")
+        return best["code"]
+
+def drop_code(viz_type, columns, question, reduction="", threshold=0.9, filepath=default_cache_path):
+    """
+    Remove the entry lookup_code returns for this request after its code failed to render.
+    The hit counted by that lookup is taken back, so the hit rate only reflects reused code that rendered.
+
+    Takes the same arguments as lookup_code.
+
+    Returns:
+        bool: Whether an entry was removed.
+    """
+    with cache_lock:
+        cache = load_cache(filepath)
+        entry = _find_entry(cache, viz_type, columns, question, reduction, threshold)
+        if entry is None:
+            return False
+        cache["entries"].remove(entry)
+        cache["stats"]["hits"] = max(cache["stats"]["hits"] - 1, 0)
+        save_cache(cache, filepath)
+        return True
+
+def store_code(viz_type, columns, question, code, reduction="", max_entries=200, filepath=default_cache_path):
+    """
+    Store code that rendered successfully, evicting the least recently used entries beyond max_entries.
+
+    Args:
+        viz_type (str): The visualization type the code was generated for.
+        columns (dict): A dictionary of the dataset's original column names and their data types.
+        question (str): The data question the code answers.
+        code (str): The generated code.
+        reduction (str, optional): The reduction method applied to the data the code was written against.
+        max_entries (int, optional): Maximum number of stored entries. Defaults to 200.
+        filepath (Path, optional): Path to the cache file.
+    """
+    with cache_lock:
+        cache = load_cache(filepath)
+        viz_type = viz_type.strip().lower()
+        schema = normalize_schema(columns)
+
+        # Replace an existing entry for the exact same request
+        cache["entries"] = [
+            entry for entry in cache["entries"]
+            if not (_same_key(entry, viz_type, schema, reduction) and entry["question"] == question)
+        ]
+        now = time.time()
+        cache["entries"].append({
+            "viz_type": viz_type,
+            "schema": schema,
+            "reduction": reduction,
+            "question": question,
+            "embedding": embed_question(question).tolist(),
+            "code": code,
+            "created": now,
+            "last_used": now,
+            "hits": 0,
+        })
+
+        if len(cache["entries"]) > max_entries:
+            cache["entries"].sort(key=lambda entry: entry["last_used"], reverse=True)
+            cache["entries"] = cache["entries"][:max_entries]
+
+        save_cache(cache, filepath)
+
+def get_cache_stats(filepath=default_cache_path):
+    """
+    Returns:
+        dict: Number of entries, lookups, hits and the hit rate of the code cache.
+    """
+    cache = load_cache(filepath)
+    lookups = cache["stats"]["lookups"]
+    hits = cache["stats"]["hits"]
+    return {
+        "entries": len(cache["entries"]),
+        "lookups": lookups,
+        "hits": hits,
+        "hit_rate": (hits / lookups) if lookups > 0 else 0,
+    }
+
+def _find_entry(cache, viz_type, columns, question, reduction, threshold):
+    # The entry with the same key whose question is most similar, if it clears the threshold
+    viz_type = viz_type.strip().lower()
+    schema = normalize_schema(columns)
+    candidates = [entry for entry in cache["entries"] if _same_key(entry, viz_type, schema, reduction)]
+
+    best, best_score = None, threshold
+    if candidates:
+        query = embed_question(question)
+        for entry in candidates:
+            score = _cosine_similarity(query, np.asarray(entry["embedding"], dtype=float))
+            if score >= best_score:
+                best, best_score = entry, score
+    return best
+
+def _same_key(entry, viz_type, schema, reduction):
+    return entry["viz_type"] == viz_type and entry["schema"] == schema and entry.get("reduction", "") == reduction
+
+def _cosine_similarity(a, b):
+    norm = np.linalg.norm(a) * np.linalg.norm(b)
+    return float(np.dot(a, b) / norm) if norm > 0 else 0.0
+
+if __name__ == "__main__":
+    print("Code cache stats:", get_cache_stats())
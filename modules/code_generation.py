@@ -1,10 +1,10 @@
 import re, ast
-import tiktoken
 
-from modules.llm.openai_client import prompt_model
-from modules.rag import index_data, get_or_create_collection, query_data
+from modules.llm.openai_client import prompt_model, prompt_model_choices
+from modules.prompts import build_codegen_prompt, count_tokens, report_prefix_size
+from modules.rag import index_data, get_or_create_collection, query_data, condense_examples
 
-def generate_code(viz_type, question, columns, summary_stats, df, examples, metrics_on):
+def generate_code(viz_type, question, columns, summary_stats, df, examples, metrics_on, data_note=""):
     """
     Generate Python code for a visualization based on provided profiling parameters.
 
@@ -16,47 +16,69 @@ def generate_code(viz_type, question, columns, summary_stats, df, examples, metr
         question (str): The data question generated by the input profiler.
         columns (dict): A dictionary of column names and their data types.
         summary_stats (dict): Summary statistics of the dataset.
+        df (DataFrame): The dataset the visualization is built from.
+        examples (str or dict): Condensed examples, or a raw query result which is condensed here.
+        metrics_on (bool): Whether to print token consumption.
+        data_note (str, optional): Description of how df was reduced for rendering, if it was.
 
     Returns:
         str: Generated Python code for creating the desired visualization.
     """
 
-    # import heuristic ruleset for designing graphs
-    file = open('ruleset.txt', 'r')
-    design_rules = file.read()
-    file.close()
-
-    # Generate Python code using the prompt_model (LLM)
-
-    response_prompt = f"""
-        Generate python code for this visualization, given the following parameters:\n
-        - Visualization Type: {viz_type}\n
-        - Data Question: {question}\n
-        - Columns: {columns}\n
-        - Summary Statistics: {summary_stats}\n
-        - Dataframe: {df}\n
-        Ensure your dataframe variable is labelled `df`.\n
-        Ensure your code is wrapped in a ```python ... ``` code block.\n
-        Model your output on the following examples:\n{examples}
-        Make sure to follor these design rules as well: {design_rules}
-    """
+    if isinstance(examples, dict):
+        examples = condense_examples(examples)
+
+    # Static instructions and design rules lead the prompt so the provider can cache them
+    response_prompt, prefix = build_codegen_prompt(viz_type, question, columns, summary_stats, df, examples, data_note)
     response = prompt_model(response_prompt)
     extracted_code = extract_code_from_response(response)
     cleaned_code = clean_code(extracted_code)
 
     if metrics_on:
-        encoding = tiktoken.encoding_for_model("gpt-4o-mini")
-
-        response_input_tokens = encoding.encode(response_prompt)
-        response_output_tokens = encoding.encode(response)
-        total_input_tokens = len(response_input_tokens)
-        total_output_tokens = len(response_output_tokens)
+        total_input_tokens = count_tokens(response_prompt)
+        total_output_tokens = count_tokens(response)
 
         print(f"Input Token Consumption: {total_input_tokens}")
         print(f"Output Token Consumption: {total_output_tokens}")
+        report_prefix_size(response_prompt, prefix)
 
     return cleaned_code
 
+def generate_code_candidates(viz_type, question, columns, summary_stats, df, examples, metrics_on, num_candidates=3, data_note=""):
+    """
+    Generate several independent code candidates for the same visualization in one LLM request.
+
+    Takes the same arguments as generate_code, plus:
+        num_candidates (int, optional): Number of completions to sample. Defaults to 3.
+
+    Returns:
+        list: One entry per completion, holding the cleaned code (str) or None if no usable
+              code could be extracted from that completion.
+    """
+    if isinstance(examples, dict):
+        examples = condense_examples(examples)
+
+    response_prompt, prefix = build_codegen_prompt(viz_type, question, columns, summary_stats, df, examples, data_note)
+    responses = prompt_model_choices(response_prompt, num_candidates)
+
+    candidates = []
+    for i, response in enumerate(responses):
+        try:
+            candidates.append(clean_code(extract_code_from_response(response)))
+        except Exception as e:
+            print(f"Candidate {i+1} produced no usable code: {e}")
+            candidates.append(None)
+
+    if metrics_on:
+        total_input_tokens = count_tokens(response_prompt)
+        total_output_tokens = sum(count_tokens(response) for response in responses)
+
+        print(f"Input Token Consumption: {total_input_tokens}")
+        print(f"Output Token Consumption: {total_output_tokens}")
+        report_prefix_size(response_prompt, prefix)
+
+    return candidates
+
 def extract_code_from_response(response):
     """
     Extracts Python code from a markdown-style code block in the given output string.
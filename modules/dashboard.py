@@ -0,0 +1,143 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import matplotlib.pyplot as plt
+
+from modules.input_profiler import profile_dataset, generate_dashboard_questions
+from modules.rag import index_data, get_or_create_collection, warm_collection, query_data_batch, condense_examples
+from modules.code_generation import generate_code, generate_code_candidates
+from modules.visualization import render_visualization, render_first_success
+from modules.code_cache import lookup_code, store_code, drop_code
+from modules.pipeline import run_stages, report_timings
+from modules.data_reduction import reduce_for_render
+
+# Ensure project root is correctly identified (assuming modules/dashboard.py is in 'modules')
+script_dir = Path(__file__).parent.resolve()
+project_root = script_dir.parent.resolve()
+
+default_output_directory = project_root / "output"
+
+def run_dashboard(dataset_path, num_charts=5, supported_classes=["bar", "line", "scatter", "histogram"],
+                  context="", metrics_on=False, use_cache=True, num_candidates=1, output_directory=default_output_directory):
+    """
+    Build several charts for one dataset from a single profiling pass.
+
+    The dataset is read and profiled once, one LLM call proposes num_charts diverse questions with
+    their visualization types, examples for all questions are retrieved in one batch query, code is
+    generated for every chart in parallel, and all charts are rendered into one output bundle.
+
+    Args:
+        dataset_path (str): The path to the CSV file.
+        num_charts (int, optional): Number of charts to create. Defaults to 5.
+        supported_classes (list, optional): List of allowed visualization types.
+        context (str, optional): Additional information from the user to direct the model's output.
+        metrics_on (bool, optional): Whether to print token consumption and stage timings.
+        use_cache (bool, optional): Whether to reuse and store code in the code cache. Defaults to True.
+        num_candidates (int, optional): Number of code candidates generated and raced per chart when
+                                        no cached code is used. Defaults to 1.
+        output_directory (Path, optional): Directory the bundle is written to. A subdirectory named
+                                           after the dataset is created inside it.
+
+    Returns:
+        list: One dict per chart with its question, viz_type, code, image path and success flag, plus
+              the candidate outcomes if candidates were raced. manifest.json in the bundle directory
+              holds {"dataset": <file name>, "charts": <this list>}.
+    """
+    bundle_directory = Path(output_directory) / Path(dataset_path).stem
+    bundle_directory.mkdir(parents=True, exist_ok=True)
+
+    def load_index():
+        annotations, _ = index_data()
+        return warm_collection(get_or_create_collection(annotations))
+
+    def retrieve(charts, index):
+        return [condense_examples(result) for result in query_data_batch([question for question, _ in charts], index)]
+
+    # Profile once and load the index while the LLM proposes the questions
+    stages = {
+        "profile": (lambda: profile_dataset(dataset_path), []),
+        "index": (load_index, []),
+        "charts": (lambda profile: generate_dashboard_questions(profile[0], profile[1], supported_classes, num_charts, context, metrics_on), ["profile"]),
+        "examples": (retrieve, ["charts", "index"]),
+    }
+    results, timings = run_stages(stages)
+    if metrics_on:
+        report_timings(stages, timings)
+
+    columns, summary_stats, df = results["profile"]
+    charts = results["charts"]
+    examples = results["examples"]
+    print(f"=== Dashboard: {len(charts)} Questions Generated ===")
+
+    def new_code(i, chart_df, data_note, chart_columns):
+        # A list of candidates to race when num_candidates > 1, else a single code string
+        question, viz_type = charts[i]
+        if num_candidates > 1:
+            return generate_code_candidates(viz_type, question, chart_columns, summary_stats, chart_df, examples[i],
+                                            metrics_on, num_candidates, data_note)
+        return generate_code(viz_type, question, chart_columns, summary_stats, chart_df, examples[i], metrics_on, data_note)
+
+    def render(entry, code, chart_df, image_path):
+        plt.close("all")
+        # Each chart gets its own copy so generated code cannot change the data seen by the next one
+        if isinstance(code, list):
+            chart, entry["code"], entry["candidates"] = render_first_success(code, df=chart_df.copy(), save_path=str(image_path))
+            return chart
+        entry["code"] = code
+        return render_visualization(code, df=chart_df.copy(), save_path=str(image_path))
+
+    def build_code(i):
+        question, viz_type = charts[i]
+        # Large datasets are reduced per chart type before the code is written against them
+        chart_df, reduction, data_note = reduce_for_render(df, viz_type, question)
+        # The prompt describes the reduced frame, while the code cache is keyed on the original columns
+        chart_columns = {col: str(dtype) for col, dtype in chart_df.dtypes.items()} if reduction else columns
+        reduced = (chart_df, reduction, data_note, chart_columns)
+
+        cached_code = lookup_code(viz_type, columns, question, reduction) if use_cache else None
+        if cached_code:
+            return cached_code, True, reduced
+        return new_code(i, chart_df, data_note, chart_columns), False, reduced
+
+    with ThreadPoolExecutor(max_workers=max(len(charts), 1)) as executor:
+        futures = [executor.submit(build_code, i) for i in range(len(charts))]
+
+    # Matplotlib is not thread-safe, so charts are rendered one after another, off-screen
+    plt.switch_backend("Agg")
+    manifest = []
+    for i, ((question, viz_type), future) in enumerate(zip(charts, futures)):
+        entry = {"question": question, "viz_type": viz_type, "code": None, "image": None, "cached": False, "success": False}
+        image_path = bundle_directory / f"chart_{i+1}.png"
+        try:
+            code, entry["cached"], (chart_df, reduction, data_note, chart_columns) = future.result()
+            chart = render(entry, code, chart_df, image_path)
+
+            if not chart and entry["cached"]:
+                print(f"Chart {i+1}: cached code failed to render; removing it from the cache and generating new code.")
+                drop_code(viz_type, columns, question, reduction)
+                entry["cached"] = False
+                chart = render(entry, new_code(i, chart_df, data_note, chart_columns), chart_df, image_path)
+        except Exception as e:
+            print(f"Chart {i+1}: code generation failed: {e}")
+            manifest.append(entry)
+            continue
+
+        if chart:
+            entry["image"] = image_path.name
+            entry["success"] = True
+            if use_cache and not entry["cached"]:
+                store_code(viz_type, columns, question, entry["code"], reduction)
+        print(f"Chart {i+1}: {'rendered' if entry['success'] else 'failed'} – {question} ({viz_type})")
+        manifest.append(entry)
+
+    with open(bundle_directory / "manifest.json", "w") as f:
+        json.dump({"dataset": os.path.basename(dataset_path), "charts": manifest}, f, indent=2)
+    print(f"=== Dashboard written to {bundle_directory} ===")
+
+    return manifest
+
+if __name__ == "__main__":
+    data_path = os.path.join(script_dir, "data/pixar_films.csv")
+    run_dashboard(data_path, num_charts=3)
@@ -0,0 +1,320 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# Large datasets are reduced before code generation and rendering, so the generated code never
+# draws more artists than a chart can meaningfully show:
+#   - line charts keep the visually important points (LTTB, or min/max decimation for several series)
+#   - scatter plots keep a stratified sample that preserves category proportions
+#   - histograms receive pre-computed bin counts, bar charts per-group counts and aggregates
+# Line and scatter reductions keep the original columns; histogram and bar reductions change the
+# frame's shape, which is described in the returned note so the code generator can use it.
+# Pre-aggregation must not lose a column the chart could be grouped by. Dimensions are text,
+# datetime and bool columns plus low-cardinality integral columns (years, months, ratings); if the
+# question names any other non-dimension column that could be a key (e.g. an id), or a histogram
+# question may be split by a dimension it does not name, the frame is left unreduced.
+# Generated code depends on the reduction, so the code cache keys entries on the returned method
+# together with the original columns.
+
+def reduce_for_render(df, viz_type, question="", max_points=5000, max_categories=50, seed=0):
+    """
+    Reduce a dataframe to a size that renders quickly for the given visualization type.
+
+    Args:
+        df (DataFrame): The full dataset.
+        viz_type (str): The visualization type determined by the input profiler.
+        question (str, optional): The data question, used to tell which columns the chart groups by.
+        max_points (int, optional): Row count above which the data is reduced, and the target size
+                                    for line and scatter reductions. Defaults to 5000.
+        max_categories (int, optional): Maximum number of distinct values for a column to be
+                                        used as a category. Defaults to 50.
+        seed (int, optional): Random seed for sampling. Defaults to 0.
+
+    Returns:
+        tuple: (reduced_df, method, note) where method names the reduction ("line", "sample", "bins",
+               "bins:<group columns>" or "category_counts:<group columns>") and note describes it for
+               the code generation prompt. Both are empty strings if the data was left unchanged.
+    """
+    if df is None or len(df) <= max_points:
+        return df, "", ""
+
+    kind = _chart_kind(viz_type)
+
+    if kind == "line":
+        categories = _category_columns(df, max_categories)
+        reduced = reduce_line(df, max_points, categories[0] if categories else None)
+        return reduced, "line", f"The dataframe holds {len(reduced)} of {len(df)} rows, chosen to preserve the shape of each line."
+    if kind == "scatter":
+        categories = _category_columns(df, max_categories)
+        reduced = stratified_sample(df, max_points, categories[0] if categories else None, seed)
+        return reduced, "sample", f"The dataframe is a random sample of {len(reduced)} of {len(df)} rows, stratified by category."
+    if kind not in ("histogram", "bar"):
+        return df, "", ""
+
+    dimensions = _dimension_columns(df, max_categories)
+    named = _named_columns(df, question)
+    # A named column that is neither a dimension nor plain text (e.g. an integer id) may be what
+    # the chart is grouped by, and pre-aggregation would turn it into a sum
+    if any(col not in dimensions and pd.api.types.is_numeric_dtype(df[col]) and _is_integral(df[col]) for col in named):
+        return df, "", ""
+
+    if kind == "histogram":
+        groups = [col for col in dimensions if col in named]
+        # Without a named dimension the question may still be split by one under another name
+        if not groups and any(df[col].nunique(dropna=False) <= max_categories for col in dimensions):
+            return df, "", ""
+        reduced = bin_counts(df, groups)
+        if reduced.empty or len(reduced) > max_points:
+            return df, "", ""
+        group_text = "".join(f", `{col}`" for col in groups)
+        return reduced, "bins" + (":" + ",".join(map(str, groups)) if groups else ""), (
+            f"The dataframe was pre-aggregated from {len(df)} rows into histogram bins: one row per bin with "
+            f"columns `column`{group_text}, `bin_left`, `bin_right` and `count`; bins of the same column share "
+            f"their edges. Plot the counts (e.g. with plt.bar or plt.stairs) instead of binning raw values."
+        )
+
+    # Group by every dimension so no category, date or integer key a bar chart could be about is
+    # lost; if there are too many combinations, group by the dimensions the question names, and
+    # if that does not shrink the data to max_points groups either, the frame is left as it is
+    keys = None
+    for candidate in (dimensions, [col for col in dimensions if col in named]):
+        if candidate and len(df.groupby(candidate, dropna=False)) <= max_points:
+            keys = candidate
+            break
+    if keys:
+        # Dimensions left out of the keys are dropped rather than summed
+        reduced = category_counts(df, keys, exclude=dimensions)
+        return reduced, "category_counts:" + ",".join(map(str, keys)), (
+            f"The dataframe was pre-aggregated from {len(df)} rows: one row per combination of {keys}, "
+            f"with `count` (number of rows) and `<column>_sum` / `<column>_mean` for each numeric measure column. "
+            f"Use these columns instead of aggregating raw rows."
+        )
+    return df, "", ""
+
+def reduce_line(df, max_points, category=None):
+    """
+    Keep the points that define the shape of each line, per category if one is given.
+    The x axis is the first datetime column, else the first monotonic numeric column, else the row order.
+    """
+    if category is not None:
+        groups = [group for _, group in df.groupby(category, sort=False, dropna=False)]
+        budget = max(max_points // len(groups), 3)
+        return pd.concat([reduce_line(group, budget) for group in groups]).sort_index()
+
+    x_column = _x_column(df)
+    ordered = df.sort_values(x_column) if x_column is not None else df
+    x = _as_float(ordered[x_column]) if x_column is not None else np.arange(len(ordered), dtype=float)
+    y_columns = [col for col in ordered.select_dtypes(include="number").columns if col != x_column]
+
+    if len(ordered) <= max_points or not y_columns:
+        return ordered.iloc[np.linspace(0, len(ordered) - 1, min(len(ordered), max_points)).astype(int)]
+    if len(y_columns) == 1:
+        positions = lttb(x, _as_float(ordered[y_columns[0]]), max_points)
+    else:
+        positions = min_max_decimation(ordered[y_columns], max_points)
+    return ordered.iloc[positions]
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Args:
+        x (ndarray): Sorted x values.
+        y (ndarray): y values.
+        threshold (int): Number of points to keep.
+
+    Returns:
+        ndarray: Positions of the kept points, in increasing order.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    y = np.nan_to_num(y)
+    every = (n - 2) / (threshold - 2)
+    positions = np.empty(threshold, dtype=int)
+    positions[0] = 0
+    positions[-1] = n - 1
+
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        # Average of the next bucket (or the last point) is the third corner of the triangle
+        next_start, next_end = end, min(int((i + 2) * every) + 1, n)
+        if next_end <= next_start:
+            next_start, next_end = n - 1, n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        areas = np.abs(
+            (x[previous] - avg_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (avg_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        positions[i + 1] = previous
+    return positions
+
+def min_max_decimation(values, max_points):
+    """
+    Split the rows into buckets and keep the rows holding the minimum and maximum of every column.
+
+    Returns:
+        ndarray: Positions of the kept rows, in increasing order.
+    """
+    n = len(values)
+    num_buckets = max(max_points // (2 * values.shape[1]), 1)
+    edges = np.linspace(0, n, num_buckets + 1).astype(int)
+    data = values.to_numpy(dtype=float, na_value=np.nan)
+
+    keep = {0, n - 1}
+    for start, end in zip(edges[:-1], edges[1:]):
+        if end <= start:
+            continue
+        bucket = data[start:end]
+        for col in range(bucket.shape[1]):
+            if np.all(np.isnan(bucket[:, col])):
+                continue
+            keep.add(start + int(np.nanargmin(bucket[:, col])))
+            keep.add(start + int(np.nanargmax(bucket[:, col])))
+    return np.array(sorted(keep))
+
+def stratified_sample(df, max_points, category=None, seed=0):
+    """
+    Sample max_points rows, keeping each category's share of the rows and at least one row per category.
+    """
+    if category is None:
+        return df.sample(n=max_points, random_state=seed).sort_index()
+
+    fraction = max_points / len(df)
+    samples = [
+        group.sample(n=max(1, round(len(group) * fraction)), random_state=seed)
+        for _, group in df.groupby(category, sort=False, dropna=False)
+    ]
+    return pd.concat(samples).sort_index()
+
+def bin_counts(df, groups=None, max_bins=50):
+    """
+    Pre-compute histogram bins for every numeric column that is not a group column, per
+    combination of the group columns if any are given. Bins of one column share their edges.
+
+    Returns:
+        DataFrame: Columns `column`, the group columns, `bin_left`, `bin_right` and `count`, one row per bin.
+    """
+    groups = list(groups or [])
+    rows = []
+    for column in df.select_dtypes(include="number").columns:
+        if column in groups:
+            continue
+        values = _as_float(df[column])
+        finite = np.isfinite(values)
+        if not finite.any():
+            continue
+        edges = np.histogram_bin_edges(values[finite], bins="auto")
+        if len(edges) - 1 > max_bins:
+            edges = np.histogram_bin_edges(values[finite], bins=max_bins)
+
+        if groups:
+            grouped = df[finite].groupby(groups, dropna=False)[column]
+            parts = [(key if isinstance(key, tuple) else (key,), _as_float(group)) for key, group in grouped]
+        else:
+            parts = [((), values[finite])]
+        for key, part in parts:
+            counts, _ = np.histogram(part, bins=edges)
+            for count, left, right in zip(counts, edges[:-1], edges[1:]):
+                rows.append({"column": column, **dict(zip(groups, key)), "bin_left": left, "bin_right": right, "count": int(count)})
+    return pd.DataFrame(rows, columns=["column", *groups, "bin_left", "bin_right", "count"])
+
+def category_counts(df, categories, exclude=()):
+    """
+    Pre-aggregate the rows per combination of categories.
+
+    Returns:
+        DataFrame: The category columns, `count`, and `<column>_sum` / `<column>_mean` per numeric
+                   column that is neither a category nor in exclude.
+    """
+    grouped = df.groupby(categories, dropna=False)
+    reduced = grouped.size().rename("count").to_frame()
+    numeric = [col for col in df.select_dtypes(include="number").columns if col not in categories and col not in exclude]
+    if numeric:
+        sums = grouped[numeric].sum().add_suffix("_sum")
+        means = grouped[numeric].mean().add_suffix("_mean")
+        reduced = reduced.join(sums).join(means)
+    return reduced.reset_index()
+
+def _chart_kind(viz_type):
+    viz_type = str(viz_type).lower()
+    for keyword, kind in (("hist", "histogram"), ("scatter", "scatter"), ("line", "line"), ("bar", "bar")):
+        if keyword in viz_type:
+            return kind
+    return None
+
+def _text_columns(df):
+    return [
+        col for col in df.columns
+        if not pd.api.types.is_numeric_dtype(df[col])
+        and not pd.api.types.is_datetime64_any_dtype(df[col])
+    ]
+
+def _dimension_columns(df, max_categories):
+    # Columns a grouped chart could be keyed on: text, datetime and bool columns, and integral
+    # numeric columns with few distinct values (years, months, ratings), even if stored as floats
+    return [
+        col for col in df.columns
+        if not pd.api.types.is_numeric_dtype(df[col])
+        or pd.api.types.is_bool_dtype(df[col])
+        or (_is_integral(df[col]) and df[col].nunique() <= max_categories)
+    ]
+
+def _is_integral(series):
+    if pd.api.types.is_integer_dtype(series):
+        return True
+    values = series.dropna()
+    return pd.api.types.is_float_dtype(series) and len(values) > 0 and bool((values == np.floor(values)).all())
+
+def _named_columns(df, question):
+    # Columns whose name (with underscores read as spaces, optionally pluralized) appears in the question
+    question = str(question or "").lower()
+    named = []
+    for col in df.columns:
+        name = re.escape(str(col).strip().lower().replace("_", " "))
+        if name and re.search(rf"\b{name}s?\b", question.replace("_", " ")):
+            named.append(col)
+    return named
+
+def _category_columns(df, max_categories):
+    # Low-cardinality text columns, fewest distinct values first
+    columns = [col for col in _text_columns(df) if df[col].nunique(dropna=False) <= max_categories]
+    return sorted(columns, key=lambda col: df[col].nunique(dropna=False))
+
+def _x_column(df):
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            return col
+    for col in df.select_dtypes(include="number").columns:
+        if df[col].is_monotonic_increasing or df[col].is_monotonic_decreasing:
+            return col
+    return None
+
+def _as_float(series):
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.astype("int64").to_numpy(dtype=float)
+    return series.to_numpy(dtype=float, na_value=np.nan)
+
+if __name__ == "__main__":
+    # Reduce a synthetic million-row dataset for every supported chart type
+    rng = np.random.default_rng(0)
+    size = 1_000_000
+    demo_df = pd.DataFrame({
+        "step": np.arange(size),
+        "value": np.cumsum(rng.normal(size=size)),
+        "other": rng.normal(size=size),
+        "group": rng.choice(["a", "b", "c"], size=size),
+    })
+    demo_df["year"] = 2000 + np.arange(size) % 20
+    for demo_type, demo_question in [("line", "How does value change over steps?"),
+                                     ("scatter", "Is value related to other?"),
+                                     ("histogram", "How is value distributed in each group?"),
+                                     ("bar", "What is the total value per year?")]:
+        reduced, method, note = reduce_for_render(demo_df, demo_type, demo_question)
+        print(f"{demo_type} ({method}): {len(demo_df)} -> {len(reduced)} rows. {note}")
@@ -1,10 +1,11 @@
 import pandas as pd
 import os
+import re
 import logging
-import tiktoken
 script_dir = os.path.dirname(__file__)  # directory of input_profiler.py
 
 from modules.llm.openai_client import prompt_model
+from modules.prompts import build_question_prompt, build_viz_type_prompt, build_dashboard_prompt, count_tokens, report_prefix_size
 
 def main(filepath, supported_classes=["line-plot", "dot-plot", "vertical-bar-graph", "horizontal-bar-graph", "pie-chart"], context = "", metrics_on=False):
     """
@@ -23,6 +24,18 @@ def main(filepath, supported_classes=["line-plot", "dot-plot", "vertical-bar-gra
             - columns (dict): A dictionary mapping column names to their data types.
             - summary_stats (dict): Summary statistics of the dataset in dictionary form.
     """
+    columns, summary_stats, df = profile_dataset(filepath)
+    question = generate_question(columns, summary_stats, supported_classes, context, metrics_on)
+    viz_type = choose_viz_type(question, columns, summary_stats, supported_classes)
+    return question, viz_type, columns, summary_stats, df
+
+def profile_dataset(filepath):
+    """
+    Read a CSV file and extract its column types and summary statistics. Does not call the LLM.
+
+    Returns:
+        tuple: (columns, summary_stats, df)
+    """
     # Load the dataset
     df = pd.read_csv(filepath)
     
@@ -31,46 +44,87 @@ def main(filepath, supported_classes=["line-plot", "dot-plot", "vertical-bar-gra
     
     # Generate summary statistics and convert to a dict for better readability in prompts
     summary_stats = df.describe().to_dict()
-    
-    question_examples = [
-        "What’s the average rating for products by brand?",
-        "How often does each error code occur in the system logs?",
-        "What are the proportions of different payment methods used by customers?",
-        "What are the top 10 most common job titles?",
-        "What percentage of total sales comes from each product category?",
-        "How do different countries’ inflation rates change over the years?",
-        "How does life expectancy vary across a set of countries?",
-        "What’s the share of devices used to access the platform (mobile vs. desktop)?",
-        "Which city has the highest average rental price?",
-        "How does website traffic vary week by week?",
-        "What’s the number of bugs reported per software module?",
-        "How is the population distributed by age group?",
-        "Which department has the highest employee turnover rate?",
-        "How much revenue does each region generate?",
-        "What’s the average salary per department?",
-        "What’s the market share of different companies in the industry?",
-        "How is revenue split among business units or departments?",
-        "What portion of total sales came from each product category?",
-        "Is there a relationship between hours studied and exam scores?",
-        "How many students are in each major?",
-        "How do sales trends compare between Product A and Product B?",
-        "What are the trends in programming language popularity by year?",
-        "Which product category has the most sales?"
-    ]
-
-    # Create an interesting data question based on the dataset characteristics
-    q_message = f"""
-    Only consider the graph types mentioned here: {supported_classes}.
-    Create a single, interesting data question based on {columns} and {summary_stats}.
-    Do not return anything besides the data question.
-    Your answer should be a simple sentence of 15 words or less.
-    Format your response like {question_examples}.
+    return columns, summary_stats, df
+
+def generate_question(columns, summary_stats, supported_classes, context="", metrics_on=False):
     """
+    Use an LLM to create an interesting data question based on the dataset characteristics.
 
-    if context != "":
-        q_message = f"The user provided this additional context, which should override anything else: {context}." + q_message
+    Returns:
+        str: The data question.
+    """
+    q_message, q_prefix = build_question_prompt(supported_classes, columns, summary_stats, context)
 
     question = prompt_model(q_message, 2.0, max_tok = 40)
+    log_question(question)
+
+    #computes token consumption if metrics are on:
+    if metrics_on:
+        total_input_tokens = count_tokens(q_message)
+        total_output_tokens = count_tokens(question)
+
+        print(f"Input token Consumption So Far: {total_input_tokens}")
+        print(f"Input token Consumption So Far: {total_output_tokens}")
+        report_prefix_size(q_message, q_prefix)
+
+    return question
+
+def choose_viz_type(question, columns, summary_stats, supported_classes):
+    """
+    Use an LLM to determine the best visualization type given the question and dataset metadata.
+
+    Returns:
+        str: The visualization type.
+    """
+    viz_message, _ = build_viz_type_prompt(supported_classes, question, columns, summary_stats)
+    return prompt_model(viz_message, 2.0)
+
+def generate_dashboard_questions(columns, summary_stats, supported_classes, num_charts, context="", metrics_on=False):
+    """
+    Use a single LLM call to create several diverse data questions, each with a visualization type.
+
+    Returns:
+        list: Up to num_charts (question, viz_type) tuples.
+    """
+    d_message, d_prefix = build_dashboard_prompt(supported_classes, columns, summary_stats, num_charts, context)
+
+    response = prompt_model(d_message, 1.0, max_tok = 60 * num_charts)
+    charts = parse_dashboard_response(response)[:num_charts]
+    for question, _ in charts:
+        log_question(question)
+    if len(charts) < num_charts:
+        print(f"Warning: asked for {num_charts} dashboard questions but could only parse {len(charts)} from the response:\n{response}")
+
+    if metrics_on:
+        print(f"Input token Consumption So Far: {count_tokens(d_message)}")
+        print(f"Output token Consumption So Far: {count_tokens(response)}")
+        report_prefix_size(d_message, d_prefix)
+
+    return charts
+
+def parse_dashboard_response(response):
+    """
+    Parse `question | viz type` lines, also accepting numbered or bulleted lists and markdown tables.
+
+    Returns:
+        list: (question, viz_type) tuples in the order they appear.
+    """
+    charts = []
+    for line in response.splitlines():
+        line = re.sub(r"^\s*(?:[-*]|\d+[.)])\s+", "", line).strip().strip("`").strip()
+        # Markdown table rows are wrapped in pipes: "| question | bar |"
+        line = line.strip("|").strip()
+        if "|" not in line:
+            continue
+        question, viz_type = (part.strip().strip("`") for part in line.rsplit("|", 1))
+        # Skip table separators ("---|---") and header rows
+        if not question or not viz_type or set(question + viz_type) <= set("-: ") or question.lower() == "question":
+            continue
+        charts.append((question, viz_type))
+    return charts
+
+def log_question(question):
+    # Generated questions feed the question diversity metric
     logger = logging.getLogger("question_evaluator")
     logger.setLevel(logging.INFO)
 
@@ -82,28 +136,6 @@ def main(filepath, supported_classes=["line-plot", "dot-plot", "vertical-bar-gra
     
     logger.info(f"Result: {question}")
 
-    # Determine the best visualization type given the question and dataset metadata
-    viz_type = prompt_model(
-        f"What is the best visualization class we should use to characterize this problem, "
-        f"given {question}, {columns}, and {summary_stats}? "
-        f"Do not return anything besides the visualization type. "
-        f"Only return a type listed in {supported_classes}", 2.0
-    )
-    
-    #computes token consumption if metrics are on:
-    if metrics_on:
-        encoding = tiktoken.encoding_for_model("gpt-4o-mini")
-
-        question_input_tokens = encoding.encode(q_message)
-        question_output_tokens = encoding.encode(question)
-        total_input_tokens = len(question_input_tokens)
-        total_output_tokens = len(question_output_tokens)
-
-        print(f"Input token Consumption So Far: {total_input_tokens}")
-        print(f"Input token Consumption So Far: {total_output_tokens}")
-
-    return question, viz_type, columns, summary_stats, df
-
 if __name__ == "__main__":
     data_path = os.path.join(script_dir, "data/pixar_films.csv")
     question, viz_type, columns, summary_stats, df = main(data_path)
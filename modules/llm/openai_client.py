@@ -12,18 +12,30 @@ model = config['openai']['model']
 # Create a new OpenAI client
 client = OpenAI(api_key=api_key)
 
-def prompt_model(prompt, temp=1.0, max_tok = 2000):
-    completion = client.chat.completions.create(
-        model=model,
-        store=True,
-        temperature=temp,
-        max_tokens=max_tok,
-        messages=[
+def build_request_body(prompt, temp=1.0, max_tok = 2000, n=1):
+    # Shared by the interactive calls below and the JSONL request files written in bulk mode
+    body = {
+        "model": model,
+        "store": True,
+        "temperature": temp,
+        "max_tokens": max_tok,
+        "messages": [
             {"role": "user", 'content': prompt}
         ]
-    )
+    }
+    if n > 1:
+        body["n"] = n
+    return body
+
+def prompt_model(prompt, temp=1.0, max_tok = 2000):
+    completion = client.chat.completions.create(**build_request_body(prompt, temp, max_tok))
     return completion.choices[0].message.content
 
+def prompt_model_choices(prompt, n, temp=1.0, max_tok = 2000):
+    # Sample n completions in a single request; input tokens are only billed once
+    completion = client.chat.completions.create(**build_request_body(prompt, temp, max_tok, n))
+    return [choice.message.content for choice in completion.choices]
+
 if __name__ == "__main__":
     # Test the LLM client is working
     text = prompt_model("Say hello world back to me.")
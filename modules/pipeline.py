@@ -0,0 +1,132 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# A stage graph maps each stage name to (func, deps). A stage starts as soon as all of its deps
+# have finished, and func is called with the results of its deps as keyword arguments, e.g.
+#
+#   stages = {
+#       "profile": (lambda: profile_dataset(path), []),
+#       "question": (lambda profile: generate_question(*profile[:2], classes), ["profile"]),
+#   }
+#
+# Stages run on threads, so they should spend their time waiting on I/O (LLM calls, disk, ChromaDB).
+
+def run_stages(stages, max_workers=None):
+    """
+    Run a stage graph, overlapping stages that do not depend on each other.
+
+    Args:
+        stages (dict): Mapping of stage name to a (func, deps) tuple.
+        max_workers (int, optional): Maximum number of concurrent stages. Defaults to one per stage.
+
+    Returns:
+        tuple: (results, timings) where results maps stage names to return values and timings maps
+               stage names to (start, end) offsets in seconds from the start of the run.
+
+    Raises:
+        ValueError: If a stage depends on an unknown stage or the graph contains a cycle.
+        Exception: The first exception raised by a stage is re-raised once running stages finish.
+    """
+    check_stages(stages)
+
+    results = {}
+    timings = {}
+    pending = dict(stages)
+    running = {}
+    run_start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(stages) or 1) as executor:
+        while pending or running:
+            ready = [name for name, (_, deps) in pending.items() if all(dep in results for dep in deps)]
+            for name in ready:
+                func, deps = pending.pop(name)
+                kwargs = {dep: results[dep] for dep in deps}
+                running[executor.submit(_timed_call, func, kwargs, run_start)] = name
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                value, started, finished = future.result()
+                results[name] = value
+                timings[name] = (started, finished)
+
+    return results, timings
+
+def check_stages(stages):
+    """
+    Validate that every dependency exists and that the stage graph is acyclic.
+    """
+    for name, (_, deps) in stages.items():
+        for dep in deps:
+            if dep not in stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'")
+
+    visited = set()
+    visiting = set()
+
+    def visit(name):
+        if name in visited:
+            return
+        if name in visiting:
+            raise ValueError(f"Stage graph contains a cycle through '{name}'")
+        visiting.add(name)
+        for dep in stages[name][1]:
+            visit(dep)
+        visiting.discard(name)
+        visited.add(name)
+
+    for name in stages:
+        visit(name)
+
+def critical_path(stages, timings):
+    """
+    Find the chain of stages that determined the total run time.
+
+    Starting from the stage that finished last, repeatedly step back to the dependency that
+    finished last, since that is the one the stage was waiting on.
+
+    Returns:
+        list: Stage names along the critical path, in execution order.
+    """
+    if not timings:
+        return []
+
+    name = max(timings, key=lambda stage: timings[stage][1])
+    path = [name]
+    while True:
+        deps = [dep for dep in stages[name][1] if dep in timings]
+        if not deps:
+            break
+        name = max(deps, key=lambda dep: timings[dep][1])
+        path.append(name)
+    return path[::-1]
+
+def report_timings(stages, timings):
+    """
+    Print the duration of every stage and the critical path of the run.
+    """
+    for name, (started, finished) in sorted(timings.items(), key=lambda item: item[1][0]):
+        print(f"Stage {name}: {finished - started:.2f}s (started at {started:.2f}s)")
+
+    path = critical_path(stages, timings)
+    if path:
+        wall_time = max(finished for _, finished in timings.values())
+        path_time = sum(timings[name][1] - timings[name][0] for name in path)
+        print(f"Critical path: {' -> '.join(path)} ({path_time:.2f}s of {wall_time:.2f}s wall time)")
+
+def _timed_call(func, kwargs, run_start):
+    started = time.perf_counter() - run_start
+    value = func(**kwargs)
+    return value, started, time.perf_counter() - run_start
+
+if __name__ == "__main__":
+    # Small demonstration: "b" and "c" overlap, so the run takes about 0.3s instead of 0.5s
+    demo_stages = {
+        "a": (lambda: time.sleep(0.1) or 1, []),
+        "b": (lambda a: time.sleep(0.2) or a + 1, ["a"]),
+        "c": (lambda a: time.sleep(0.1) or a + 2, ["a"]),
+        "d": (lambda b, c: b + c, ["b", "c"]),
+    }
+    results, timings = run_stages(demo_stages)
+    print("Results:", results)
+    report_timings(demo_stages, timings)
@@ -0,0 +1,226 @@
+import os
+from functools import lru_cache
+
+import tiktoken
+
+# Ensure project root is correctly identified (assuming modules/prompts.py is in 'modules')
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(script_dir)
+
+default_ruleset_path = os.path.join(project_root, "ruleset.txt")
+
+# Every prompt is laid out as <static prefix><per-dataset suffix>. The prefix only holds
+# content that never changes between calls (instructions, ruleset, examples), so that
+# provider-side prompt caching can reuse it across requests. Anything that depends on the
+# dataset, the question or the user context must go into the suffix.
+# OpenAI only caches prompts whose shared prefix is at least 1024 tokens long. The prefixes below
+# are currently shorter than that, so the layout only pays off once the static content
+# (ruleset, examples) grows; report_prefix_size flags prefixes that are too short to be cached.
+
+PROMPT_CACHE_MIN_TOKENS = 1024
+
+QUESTION_EXAMPLES = [
+    "What’s the average rating for products by brand?",
+    "How often does each error code occur in the system logs?",
+    "What are the proportions of different payment methods used by customers?",
+    "What are the top 10 most common job titles?",
+    "What percentage of total sales comes from each product category?",
+    "How do different countries’ inflation rates change over the years?",
+    "How does life expectancy vary across a set of countries?",
+    "What’s the share of devices used to access the platform (mobile vs. desktop)?",
+    "Which city has the highest average rental price?",
+    "How does website traffic vary week by week?",
+    "What’s the number of bugs reported per software module?",
+    "How is the population distributed by age group?",
+    "Which department has the highest employee turnover rate?",
+    "How much revenue does each region generate?",
+    "What’s the average salary per department?",
+    "What’s the market share of different companies in the industry?",
+    "How is revenue split among business units or departments?",
+    "What portion of total sales came from each product category?",
+    "Is there a relationship between hours studied and exam scores?",
+    "How many students are in each major?",
+    "How do sales trends compare between Product A and Product B?",
+    "What are the trends in programming language popularity by year?",
+    "Which product category has the most sales?"
+]
+
+@lru_cache(maxsize=None)
+def load_ruleset(filepath=default_ruleset_path):
+    """
+    Read the heuristic ruleset for designing graphs. The file is only read once per process.
+
+    Args:
+        filepath (str, optional): Path to the ruleset file. Defaults to 'ruleset.txt' in the project root.
+
+    Returns:
+        str: The contents of the ruleset file.
+    """
+    with open(filepath, 'r') as f:
+        return f.read()
+
+@lru_cache(maxsize=None)
+def question_prefix(supported_classes):
+    """
+    Static prefix of the data question prompt.
+
+    Args:
+        supported_classes (tuple): Allowed visualization types. Must be a tuple so the prefix can be cached.
+
+    Returns:
+        str: The invariant leading part of the data question prompt.
+    """
+    return (
+        f"Only consider the graph types mentioned here: {list(supported_classes)}.\n"
+        f"Create a single, interesting data question based on the columns and summary statistics given below.\n"
+        f"Do not return anything besides the data question.\n"
+        f"Your answer should be a simple sentence of 15 words or less.\n"
+        f"Format your response like {QUESTION_EXAMPLES}.\n"
+    )
+
+def build_question_prompt(supported_classes, columns, summary_stats, context=""):
+    """
+    Build the prompt asking the LLM for a data question.
+
+    Returns:
+        tuple: (prompt, prefix) where prefix is the cacheable leading part of prompt.
+    """
+    prefix = question_prefix(tuple(supported_classes))
+    suffix = f"- Columns: {columns}\n- Summary Statistics: {summary_stats}\n"
+    if context != "":
+        suffix += f"The user provided this additional context, which should override anything else: {context}.\n"
+    return prefix + suffix, prefix
+
+@lru_cache(maxsize=None)
+def dashboard_prefix(supported_classes):
+    """
+    Static prefix of the dashboard prompt, which asks for several questions and their chart types at once.
+
+    Args:
+        supported_classes (tuple): Allowed visualization types.
+
+    Returns:
+        str: The invariant leading part of the dashboard prompt.
+    """
+    return (
+        f"Only consider the graph types mentioned here: {list(supported_classes)}.\n"
+        f"Create diverse, interesting data questions based on the columns and summary statistics given below, "
+        f"each looking at a different aspect of the data, and choose the best visualization type for each.\n"
+        f"Return one line per question formatted as `<question> | <visualization type>` and nothing else.\n"
+        f"Each question should be a simple sentence of 15 words or less.\n"
+        f"Format your questions like {QUESTION_EXAMPLES}.\n"
+    )
+
+def build_dashboard_prompt(supported_classes, columns, summary_stats, num_charts, context=""):
+    """
+    Build the prompt asking the LLM for num_charts question and visualization type pairs.
+
+    Returns:
+        tuple: (prompt, prefix) where prefix is the cacheable leading part of prompt.
+    """
+    prefix = dashboard_prefix(tuple(supported_classes))
+    suffix = (
+        f"- Number of Questions: {num_charts}\n"
+        f"- Columns: {columns}\n"
+        f"- Summary Statistics: {summary_stats}\n"
+    )
+    if context != "":
+        suffix += f"The user provided this additional context, which should override anything else: {context}.\n"
+    return prefix + suffix, prefix
+
+@lru_cache(maxsize=None)
+def viz_type_prefix(supported_classes):
+    """
+    Static prefix of the visualization type prompt.
+
+    Args:
+        supported_classes (tuple): Allowed visualization types.
+
+    Returns:
+        str: The invariant leading part of the visualization type prompt.
+    """
+    return (
+        f"What is the best visualization class we should use to characterize the problem below? "
+        f"Do not return anything besides the visualization type. "
+        f"Only return a type listed in {list(supported_classes)}.\n"
+    )
+
+def build_viz_type_prompt(supported_classes, question, columns, summary_stats):
+    """
+    Build the prompt asking the LLM for the visualization type best suited to a question.
+
+    Returns:
+        tuple: (prompt, prefix) where prefix is the cacheable leading part of prompt.
+    """
+    prefix = viz_type_prefix(tuple(supported_classes))
+    suffix = (
+        f"- Data Question: {question}\n"
+        f"- Columns: {columns}\n"
+        f"- Summary Statistics: {summary_stats}\n"
+    )
+    return prefix + suffix, prefix
+
+@lru_cache(maxsize=None)
+def codegen_prefix(ruleset_path=default_ruleset_path):
+    """
+    Static prefix of the code generation prompt: instructions followed by the design ruleset.
+
+    Returns:
+        str: The invariant leading part of the code generation prompt.
+    """
+    return (
+        "Generate python code for a visualization, given the parameters listed at the end of this prompt.\n"
+        "Ensure your dataframe variable is labelled `df`.\n"
+        "Ensure your code is wrapped in a ```python ... ``` code block.\n"
+        f"Make sure to follow these design rules as well:\n{load_ruleset(ruleset_path)}\n"
+        "Model your output on the examples given with the parameters.\n"
+    )
+
+def build_codegen_prompt(viz_type, question, columns, summary_stats, df, examples, data_note=""):
+    """
+    Build the prompt asking the LLM to write the visualization code.
+
+    Returns:
+        tuple: (prompt, prefix) where prefix is the cacheable leading part of prompt.
+    """
+    prefix = codegen_prefix()
+    suffix = (
+        f"- Visualization Type: {viz_type}\n"
+        f"- Data Question: {question}\n"
+        f"- Columns: {columns}\n"
+        f"- Summary Statistics: {summary_stats}\n"
+        f"- Dataframe: {df}\n"
+        f"- Examples:\n{examples}\n"
+    )
+    if data_note:
+        suffix += f"- Data Note: {data_note}\n"
+    return prefix + suffix, prefix
+
+@lru_cache(maxsize=None)
+def get_encoding(model="gpt-4o-mini"):
+    return tiktoken.encoding_for_model(model)
+
+def count_tokens(text, model="gpt-4o-mini"):
+    return len(get_encoding(model).encode(text))
+
+def report_prefix_size(prompt, prefix):
+    """
+    Print the size of the prompt's static prefix and whether it is long enough for prompt caching.
+    """
+    prefix_tokens = count_tokens(prefix)
+    total_tokens = count_tokens(prompt)
+    if prefix_tokens >= PROMPT_CACHE_MIN_TOKENS:
+        print(f"Cacheable Prefix Tokens: {prefix_tokens} of {total_tokens}")
+    else:
+        print(f"Static Prefix Tokens: {prefix_tokens} of {total_tokens} "
+              f"(below the {PROMPT_CACHE_MIN_TOKENS}-token minimum for prompt caching, not cacheable)")
+
+if __name__ == "__main__":
+    # Show the static prefixes and their token sizes
+    supported = ["bar", "line", "scatter", "histogram"]
+    for name, prefix in [("question", question_prefix(tuple(supported))),
+                         ("viz type", viz_type_prefix(tuple(supported))),
+                         ("dashboard", dashboard_prefix(tuple(supported))),
+                         ("codegen", codegen_prefix())]:
+        tokens = count_tokens(prefix)
+        print(f"{name} prefix: {tokens} tokens" + ("" if tokens >= PROMPT_CACHE_MIN_TOKENS else " (too short to cache)"))
@@ -1,3 +1,5 @@
+import ast
+import difflib
 import json
 import os
 from pathlib import Path # Using pathlib for more robust path handling
@@ -11,10 +13,20 @@ from chromadb.config import DEFAULT_TENANT, DEFAULT_DATABASE, Settings
 import chromadb
 from chromadb.utils import embedding_functions # Useful for explicitly defining embedding functions
 
+from modules.prompts import count_tokens
+
 # Define paths relative to the project root for consistency
 default_filepath = project_root / "data" / "annotations.json"
 index_directory = project_root / "data" / "chroma_storage"
 
+# One embedding model per process: the annotation index and the code cache both embed with this
+# instance, so the ONNX MiniLM model is only loaded once
+embedding_function = embedding_functions.DefaultEmbeddingFunction()
+
+# Keys of `general_figure_info` that describe chart design; everything else is layout noise
+design_fields = ("title", "x_axis", "y_axis", "legend")
+layout_keys = {"bbox", "bboxes", "preview"}
+
 def index_data(json_filepath=default_filepath):
     """
     Load annotation data from a JSON file and extract annotations and types.
@@ -87,13 +99,13 @@ def get_or_create_collection(annotations, collection_name="c2c", max_documents=1
 
     try:
         # Try to get the collection
-        collection = client.get_collection(name=collection_name)
+        collection = client.get_collection(name=collection_name, embedding_function=embedding_function)
         print(f"Collection '{collection_name}' found.")
     except chromadb.errors.NotFoundError: # CORRECTED EXCEPTION TYPE
         print(f"Collection '{collection_name}' not found. Creating a new collection.")
         # When creating a collection, you can also specify the embedding function
         # collection = client.create_collection(name=collection_name, embedding_function=default_ef)
-        collection = client.create_collection(name=collection_name)
+        collection = client.create_collection(name=collection_name, embedding_function=embedding_function)
 
         # Ensure documents are added correctly
         # ChromaDB's .add() expects lists for documents, metadatas, and ids
@@ -149,6 +161,119 @@ def query_data(question, collection, n_results=2):
     )
     return examples
 
+def query_data_batch(questions, collection, n_results=2):
+    """
+    Query the collection for several questions in one call.
+
+    Args:
+        questions (list): The input query strings.
+        collection (Collection): The ChromaDB collection to be queried.
+        n_results (int, optional): Number of returned results per question. Defaults to 2.
+
+    Returns:
+        list: One query result per question, each shaped like the output of query_data.
+    """
+    if not questions:
+        return []
+
+    results = collection.query(query_texts=list(questions), n_results=n_results)
+    per_question = []
+    for i in range(len(questions)):
+        per_question.append({
+            key: [value[i]] if isinstance(value, list) and key != "included" and len(value) == len(questions) else value
+            for key, value in results.items()
+        })
+    return per_question
+
+def warm_collection(collection):
+    """
+    Run a throwaway query so the collection's embedding model is loaded before the first real query.
+    """
+    if collection.count() > 0:
+        collection.query(query_texts=["warmup"], n_results=1)
+    return collection
+
+def condense_examples(examples, max_distance=1.5, similarity_cutoff=0.9, max_tokens=600, max_list_items=5):
+    """
+    Reduce a raw ChromaDB query result to the compact example text used in the code generation prompt.
+
+    Only the design-relevant fields of each annotation are kept (title, axes and legend text,
+    without bounding boxes). Examples further than max_distance from the question are dropped,
+    near-identical examples are deduplicated, and the output is capped at max_tokens.
+
+    Args:
+        examples (dict): The query results returned by query_data.
+        max_distance (float, optional): Largest distance an example may have to be kept. Defaults to 1.5.
+        similarity_cutoff (float, optional): Text similarity ratio above which an example counts as a duplicate. Defaults to 0.9.
+        max_tokens (int, optional): Token budget for all examples combined. Defaults to 600.
+        max_list_items (int, optional): Number of items kept from list fields such as tick labels. Defaults to 5.
+
+    Returns:
+        str: One condensed example per line, or a placeholder if no example is relevant.
+    """
+    documents = (examples.get("documents") or [[]])[0] if examples else []
+    distances = (examples.get("distances") or [[]])[0] if examples else []
+
+    condensed = []
+    used_tokens = 0
+    for i, doc in enumerate(documents):
+        distance = distances[i] if i < len(distances) else None
+        if distance is not None and distance > max_distance:
+            continue
+
+        text = condense_annotation(doc, max_list_items)
+        if not text:
+            continue
+        if any(difflib.SequenceMatcher(None, text, kept).ratio() >= similarity_cutoff for kept in condensed):
+            continue
+
+        tokens = count_tokens(text)
+        if used_tokens + tokens > max_tokens:
+            continue
+        condensed.append(text)
+        used_tokens += tokens
+
+    if not condensed:
+        return "No relevant examples found."
+    return "\n".join(f"Example {i+1}: {text}" for i, text in enumerate(condensed))
+
+def condense_annotation(document, max_list_items=5):
+    """
+    Turn a stringified `general_figure_info` dict into a single line of design fields.
+    Documents that cannot be parsed are returned with whitespace collapsed.
+    """
+    try:
+        info = ast.literal_eval(document)
+    except (ValueError, SyntaxError):
+        return " ".join(str(document).split())
+    if not isinstance(info, dict):
+        return " ".join(str(info).split())
+
+    if any(field in info for field in design_fields):
+        info = {field: info[field] for field in design_fields if field in info}
+
+    parts = []
+    for path, value in _flatten_fields(info, max_list_items):
+        parts.append(f"{path}: {value}")
+    return "; ".join(parts)
+
+def _flatten_fields(value, max_list_items, path=""):
+    # Walk nested dicts, skipping layout keys and keeping only the first few list items
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key in layout_keys:
+                continue
+            yield from _flatten_fields(item, max_list_items, f"{path}.{key}" if path else str(key))
+    elif isinstance(value, list):
+        items = [item for item in value if not isinstance(item, (dict, list))][:max_list_items]
+        if items:
+            yield path, ", ".join(str(item) for item in items)
+        for item in value[:max_list_items]:
+            if isinstance(item, (dict, list)):
+                yield from _flatten_fields(item, max_list_items, path)
+    elif value not in (None, ""):
+        yield path, value
+
 if __name__ == "__main__":
     print("Starting ChromaDB RAG module...")
     # For testing: index data and get the persistent collection.
@@ -162,6 +287,8 @@ if __name__ == "__main__":
         # Check if the collection has documents before querying
         if collection.count() > 0:
             results = query_data(sample_question, collection)
+            print("\n--- Condensed Examples ---")
+            print(condense_examples(results))
             print("\n--- Query Results ---")
             if results and results.get('documents'):
                 for i, doc in enumerate(results['documents'][0]): # Assuming one query text, so results[0]
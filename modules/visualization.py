@@ -1,7 +1,12 @@
+import multiprocessing
+import pickle
+import queue
+import time
+
 import matplotlib.pyplot as plt
 import pandas as pd
 
-def render_visualization(generated_code, df=None, return_raw=False):
+def render_visualization(generated_code, df=None, return_raw=False, save_path=None):
     """
     Executes the validated Python code for visualization, renders the resulting chart,
     and optionally returns the raw Python code.
@@ -14,6 +19,8 @@ def render_visualization(generated_code, df=None, return_raw=False):
         generated_code (str): The validated Python code to execute.
         return_raw (bool, optional): Whether to also return the raw code alongside the chart.
                                      Defaults to False.
+        save_path (str, optional): If given, the chart is saved to this file and closed
+                                   instead of being shown.
 
     Returns:
         If return_raw is False:
@@ -35,8 +42,12 @@ def render_visualization(generated_code, df=None, return_raw=False):
     # assuming that the generated code produced a chart.
     try:
         chart = plt.gcf()
-        # Render the chart. In interactive environments, this may display the chart immediately.
-        plt.show()
+        if save_path:
+            chart.savefig(save_path, bbox_inches="tight")
+            plt.close(chart)
+        else:
+            # Render the chart. In interactive environments, this may display the chart immediately.
+            plt.show()
     except Exception as e:
         print("Failed to render the visualization:", e)
         chart = None
@@ -46,6 +57,105 @@ def render_visualization(generated_code, df=None, return_raw=False):
     
     return chart
 
+def render_first_success(candidates, df=None, timeout=60, save_path=None):
+    """
+    Validate and trial-run several code candidates in parallel and keep the first one that succeeds.
+
+    Each candidate is compiled, then executed in its own spawned worker process with a
+    non-interactive backend. The first candidate that runs without error wins: its figure is sent back to this
+    process and shown (or saved), and the workers still running the other candidates are terminated.
+    Candidates that have not finished after timeout seconds are terminated as well.
+
+    Args:
+        candidates (list): Generated code strings. None entries count as candidates without usable code.
+        df (DataFrame, optional): The dataframe made available to the code as `df`.
+        timeout (float, optional): Seconds to wait for a successful candidate. Defaults to 60.
+        save_path (str, optional): If given, the winning chart is saved to this file and closed
+                                   instead of being shown.
+
+    Returns:
+        tuple: (chart, code, outcomes) where chart and code are None if no candidate succeeded, and
+               outcomes is a list of dicts with the index, status, error and elapsed time of each candidate.
+               Status is one of "invalid", "failed", "succeeded", "cancelled" (terminated after another
+               candidate won) or "timed out".
+    """
+    outcomes = [{"index": i, "status": "pending", "error": None, "elapsed": None} for i in range(len(candidates))]
+
+    valid = []
+    for i, code in enumerate(candidates):
+        if code is None:
+            outcomes[i].update(status="invalid", error="no code extracted")
+            continue
+        try:
+            compile(code, f"<candidate {i}>", "exec")
+        except SyntaxError as e:
+            outcomes[i].update(status="invalid", error=str(e))
+            continue
+        valid.append(i)
+
+    winner, figure = None, None
+    # Spawn fresh workers instead of forking a process that already runs ChromaDB, ONNX and
+    # thread-pool threads, whose locks a forked child could inherit in a held state
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    workers = {i: context.Process(target=_trial_run, args=(i, candidates[i], df, results), daemon=True) for i in valid}
+    for worker in workers.values():
+        worker.start()
+
+    running = set(valid)
+    deadline = time.monotonic() + timeout
+    try:
+        while running and winner is None:
+            try:
+                i, error, elapsed, pickled_figure = results.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            running.discard(i)
+            outcomes[i].update(status="failed" if error else "succeeded", error=error, elapsed=elapsed)
+            if error is None:
+                winner, figure = i, pickled_figure
+    finally:
+        for i in running:
+            outcomes[i]["status"] = "cancelled" if winner is not None else "timed out"
+        # Stop the losing candidates instead of leaving them running in the background
+        for worker in workers.values():
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
+
+    if winner is None:
+        return None, None, outcomes
+
+    chart = None
+    try:
+        # Unpickling a pyplot figure registers it with pyplot again, so it can be shown directly
+        chart = pickle.loads(figure)
+        if save_path:
+            chart.savefig(save_path, bbox_inches="tight")
+            plt.close(chart)
+        else:
+            plt.show()
+    except Exception as e:
+        print("Failed to render the visualization:", e)
+    return chart, candidates[winner], outcomes
+
+def _trial_run(index, generated_code, df, results):
+    # Runs in a worker process: execute the code off-screen and put
+    # (index, error, elapsed seconds, pickled figure) on the results queue
+    plt.switch_backend("Agg")
+    plt.close("all")
+    start = time.perf_counter()
+    pickled_figure = None
+    try:
+        exec(generated_code, {'df': df})
+        pickled_figure = pickle.dumps(plt.gcf())
+        error = None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        plt.close("all")
+    results.put((index, error, time.perf_counter() - start, pickled_figure))
+
 if __name__ == "__main__":
     # Test example: a simple generated code snippet that creates a plot.
     test_generated_code = """